@@ -1,18 +1,27 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import RedirectResponse, HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Header, BackgroundTasks
+from fastapi.responses import RedirectResponse, HTMLResponse, FileResponse, Response, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, field_validator
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from typing import NamedTuple, Optional
+from collections import OrderedDict
+import asyncio
+import mmap
 import os
+import re
+import stat
+import sys
 import html
 import logging
+import threading
+import uuid
+import numpy as np
 
-from .indexer import load_index, build_index, extract_pdf_text
+from .indexer import load_index, build_index, extract_pdf_text, load_extractors
 from .retriever import Retriever
-from .llm import answer_query
-from .config import MAX_QUERY_LENGTH, MAX_RESULTS_PER_PAGE, DEFAULT_RESULTS_PER_PAGE
+from .llm import ProviderError, answer_query_async
+from .config import MAX_QUERY_LENGTH, MAX_RESULTS_PER_PAGE, DEFAULT_RESULTS_PER_PAGE, QUERY_CACHE_SIZE, QUERY_CACHE_MAX_MB
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,31 +29,118 @@ logger = logging.getLogger(__name__)
 INDEX_PATH = os.environ.get("RAG_INDEX_PATH", os.path.join(os.getcwd(), "data", "index.joblib"))
 DATA_DIR = os.environ.get("RAG_DATA_DIR", os.path.join(os.getcwd(), "data"))
 
-# Application state
-app_state = {"index": None, "retriever": None, "rebuilding": False}
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed.
+
+    Query responses carry every ranked document, so encoding is a noticeable
+    share of request time; orjson is several times faster than json.dumps.
+    """
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class LoadedIndex(NamedTuple):
+    """The server-loaded index, its retriever, and a version bumped on every swap.
+
+    Published as one object in app_state["loaded"] and replaced with a single
+    assignment, so a request that reads it once always sees a vectorizer, postings
+    and cache version that belong together, even while a rebuild swaps the index.
+    """
+    index: dict
+    retriever: Retriever
+    version: int
+
+
+# Application state ("loaded" is a LoadedIndex, or None when no index is loaded)
+app_state = {"loaded": None, "rebuilding": False}
+
+
+class QueryCache:
+    """Bounded LRU of ranked results + answers for the server-loaded index.
+
+    Entries hold only pagination-independent data (ranked row indices, scores and
+    the answer); page text is sliced on each hit from the same LoadedIndex the
+    entry was computed from. Keys include that LoadedIndex's version, so an entry
+    stored by a query that was still running on a replaced index is never served
+    to requests against the new one; it just ages out.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, approximate bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_bytes(value) -> int:
+        # Answer string plus the two ranking lists and their int/float objects
+        idxs, sims, answer = value
+        return sys.getsizeof(answer) + sys.getsizeof(idxs) + sys.getsizeof(sims) + 56 * len(idxs)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        size = self._entry_bytes(value)
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+query_cache = QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_MAX_MB * 1024 * 1024)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Startup: import the PDF/Word libraries now rather than in the first rebuild or /view
+    load_extractors()
     # Startup: load index
     try:
         logger.info(f"Loading index from {INDEX_PATH}")
-        app_state["index"] = load_index(INDEX_PATH)
-        app_state["retriever"] = Retriever.from_index(app_state["index"])
-        num_docs = len(app_state["index"].get("docs", []))
+        index = load_index(INDEX_PATH)
+        app_state["loaded"] = LoadedIndex(index, Retriever.from_index(index), 0)
+        num_docs = len(index.get("docs", []))
         logger.info(f"Index loaded successfully: {num_docs} documents")
     except Exception as e:
         logger.warning(f"Failed to load index: {e}. Server will start without index.")
-        app_state["index"] = None
-        app_state["retriever"] = None
+        app_state["loaded"] = None
     yield
     # Shutdown: cleanup if needed
     logger.info("Shutting down RAG API server")
-    app_state["index"] = None
-    app_state["retriever"] = None
+    app_state["loaded"] = None
 
 
-app = FastAPI(title="RAG Sample API", lifespan=lifespan)
+app = FastAPI(title="RAG Sample API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Allow all origins for simplicity; adjust in production
 app.add_middleware(
@@ -84,90 +180,151 @@ class QueryRequest(BaseModel):
 
 @app.get("/health")
 def health():
+    loaded = app_state["loaded"]
     status = {
         "status": "ok", 
-        "index_loaded": app_state["index"] is not None,
+        "index_loaded": loaded is not None,
         "rebuilding": app_state.get("rebuilding", False),
-        "num_documents": len(app_state["index"].get("docs", [])) if app_state["index"] else 0
+        "num_documents": len(loaded.index.get("docs", [])) if loaded else 0
     }
     logger.debug(f"Health check: {status}")
     return status
 
 
-@app.post("/rebuild-index")
-def rebuild_index():
-    """Rebuild the index from files in the data directory."""
-    if app_state.get("rebuilding", False):
-        logger.warning("Rebuild request rejected: already in progress")
-        raise HTTPException(status_code=409, detail="Index rebuild already in progress")
-    
+# Rebuild jobs by id, oldest first; only the most recent MAX_REBUILD_JOBS are kept
+rebuild_jobs = {}
+MAX_REBUILD_JOBS = 20
+_rebuild_lock = threading.Lock()
+
+
+def _run_rebuild(job_id: str, incremental: bool):
+    """Background task: rebuild the index and swap it into app_state."""
+    job = rebuild_jobs[job_id]
     try:
-        app_state["rebuilding"] = True
-        logger.info(f"Starting index rebuild from {DATA_DIR}")
-        
-        # Build new index
-        new_index = build_index(DATA_DIR, INDEX_PATH)
-        
-        # Update application state with new index
-        app_state["index"] = new_index
-        app_state["retriever"] = Retriever.from_index(new_index)
-        
+        job["status"] = "running"
+        logger.info(f"Starting index rebuild from {DATA_DIR} (job {job_id})")
+
+        # Build new index (refit from scratch unless incremental=true)
+        new_index = build_index(DATA_DIR, INDEX_PATH, incremental=incremental)
+
+        # Swap in the new index with one assignment; only one rebuild runs at a time,
+        # so nothing else changes the version meanwhile
+        old = app_state["loaded"]
+        version = old.version + 1 if old else 1
+        app_state["loaded"] = LoadedIndex(new_index, Retriever.from_index(new_index), version)
+        query_cache.clear()
+
         num_docs = len(new_index.get('docs', []))
         logger.info(f"Index rebuilt successfully: {num_docs} documents")
-        
-        return {
-            "status": "success",
-            "message": f"Index rebuilt successfully with {num_docs} documents",
-            "num_documents": num_docs,
-            "index_path": INDEX_PATH
-        }
+        job.update(
+            status="success",
+            message=f"Index rebuilt successfully with {num_docs} documents",
+            num_documents=num_docs,
+        )
     except Exception as e:
         logger.error(f"Failed to rebuild index: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to rebuild index: {str(e)}")
+        job.update(status="failed", message=f"Failed to rebuild index: {str(e)}")
     finally:
         app_state["rebuilding"] = False
 
 
+@app.post("/rebuild-index", status_code=202)
+def rebuild_index(
+    background_tasks: BackgroundTasks,
+    incremental: bool = Query(False, description="Only re-index new/changed files, keeping the existing vocabulary"),
+):
+    """Start rebuilding the index from files in the data directory.
+
+    Returns immediately with a job id; poll GET /rebuild-index/{job_id} for the outcome.
+    """
+    # Check-and-set under a lock so two concurrent requests cannot both start a rebuild
+    with _rebuild_lock:
+        if app_state.get("rebuilding", False):
+            logger.warning("Rebuild request rejected: already in progress")
+            raise HTTPException(status_code=409, detail="Index rebuild already in progress")
+        app_state["rebuilding"] = True
+
+    job_id = uuid.uuid4().hex
+    rebuild_jobs[job_id] = {"job_id": job_id, "status": "pending", "index_path": INDEX_PATH}
+    while len(rebuild_jobs) > MAX_REBUILD_JOBS:
+        del rebuild_jobs[next(iter(rebuild_jobs))]
+    background_tasks.add_task(_run_rebuild, job_id, incremental)
+    return rebuild_jobs[job_id]
+
+
+@app.get("/rebuild-index/{job_id}")
+def rebuild_status(job_id: str):
+    """Report the status of a rebuild job: pending, running, success or failed."""
+    job = rebuild_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown rebuild job: {job_id}")
+    return job
+
+
+def _load_index_and_retriever(index_path: str):
+    index = load_index(index_path)
+    return index, Retriever.from_index(index)
+
+
 @app.post("/query")
-def query(req: QueryRequest):
+async def query(req: QueryRequest):
+    # Async handler: blocking steps (index load, scoring, answer generation) run in
+    # worker threads so the event loop keeps serving other requests meanwhile
     logger.info(f"Query request: q='{req.q[:50]}...', provider={req.provider}, page={req.page}")
     index_path = req.index_path or INDEX_PATH
     try:
+        cache_key = None
         if req.index_path:
-            index = load_index(index_path)
-            retriever = Retriever.from_index(index)
+            index, retriever = await asyncio.to_thread(_load_index_and_retriever, index_path)
         else:
-            if app_state["index"] is None:
+            # Read once: a rebuild may swap app_state["loaded"] while this request runs
+            loaded = app_state["loaded"]
+            if loaded is None:
                 raise HTTPException(status_code=500, detail="Index not loaded on server")
-            index = app_state["index"]
-            retriever = app_state["retriever"]
-
-        vec = index.get('vectorizer')
-        if vec is None:
-            raise HTTPException(status_code=500, detail="Index missing vectorizer; re-build index")
-
-        qv = vec.transform([req.q]).toarray()
-
-        # IMPORTANT:
-        # - For LLM providers, we intentionally limit context size.
-        # - For the 'simple' provider, we must search across ALL documents; client-side
-        #   pagination expects the answer HTML to include all matches.
-        if req.provider == 'simple':
-            num_docs = len(index['docs'])
-            idxs, sims = retriever.query(qv, top_k=num_docs)
-            all_results = [{"id": index['docs'][i]['id'], "score": s, "text": index['docs'][i]['text']} for i, s in zip(idxs, sims)]
-
-            # Generate the answer from ALL docs (not just the first page), so variants like
-            # 'bowtie' vs 'bow-tie' are found even when TF-IDF similarity is low.
-            contexts = [r['text'] for r in all_results]
-            doc_ids = [r['id'] for r in all_results]
-            answer = answer_query(req.q, contexts, provider=req.provider, doc_ids=doc_ids, top_k=req.per_page)
+            index, retriever = loaded.index, loaded.retriever
+            cache_key = (req.q, req.provider, req.per_page, loaded.version)
+
+        cached = query_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            idxs, sims, answer = cached
+            contexts = [retriever.texts[i] for i in idxs]
+            doc_ids = [retriever.ids[i] for i in idxs]
         else:
-            idxs, sims = retriever.query(qv, top_k=req.per_page * 3)
-            all_results = [{"id": index['docs'][i]['id'], "score": s, "text": index['docs'][i]['text']} for i, s in zip(idxs, sims)]
-            contexts = [r['text'] for r in all_results]
-            doc_ids = [r['id'] for r in all_results]
-            answer = answer_query(req.q, contexts, provider=req.provider, doc_ids=doc_ids, top_k=req.per_page)
+            vec = index.get('vectorizer')
+            if vec is None:
+                raise HTTPException(status_code=500, detail="Index missing vectorizer; re-build index")
+
+            qv = vec.transform([req.q])
+
+            # IMPORTANT:
+            # - For LLM providers, we intentionally limit context size.
+            # - For the 'simple' provider, we must search across ALL documents; client-side
+            #   pagination expects the answer HTML to include all matches. That is the one
+            #   case that needs a full ranking; the LLM branch only selects its top k.
+            if req.provider == 'simple':
+                # Generate the answer from ALL docs (not just the first page), so variants like
+                # 'bowtie' vs 'bow-tie' are found even when TF-IDF similarity is low.
+                top_k = len(retriever.ids)
+            else:
+                top_k = req.per_page * 3
+            idxs, sims = await asyncio.to_thread(retriever.query, qv, top_k)
+            contexts = [retriever.texts[i] for i in idxs]
+            doc_ids = [retriever.ids[i] for i in idxs]
+            try:
+                answer = await answer_query_async(req.q, contexts, provider=req.provider, doc_ids=doc_ids, top_k=req.per_page)
+            except ProviderError as e:
+                # Shown to the user like an answer, but not cached: the failure may be
+                # transient (timeout, model being replaced)
+                logger.warning(f"Provider {req.provider} failed: {e}")
+                answer = str(e)
+                cache_key = None
+
+            if cache_key:
+                query_cache.put(cache_key, (idxs, sims, answer))
+
+        # Only the current page carries document text; the full ranking is ids and
+        # scores (clients fetch any other document's text from /doc)
+        all_results = [{"id": doc_id, "score": s} for doc_id, s in zip(doc_ids, sims)]
 
         # Calculate pagination (server-side pagination for the `results` field)
         total_results = len(all_results)
@@ -175,13 +332,15 @@ def query(req: QueryRequest):
         page = max(1, min(req.page, total_pages if total_pages > 0 else 1))  # Ensure valid page
 
         start_idx = (page - 1) * req.per_page
-        end_idx = start_idx + req.per_page
-        page_results = all_results[start_idx:end_idx]
+        end_idx = min(start_idx + req.per_page, total_results)
+        page_results = [{**all_results[j], "text": contexts[j]} for j in range(start_idx, end_idx)]
 
-        return {
+        # Already plain JSON types: return the response directly so FastAPI does not
+        # walk the whole payload through jsonable_encoder first
+        return FastJSONResponse({
             "query": req.q,
             "results": page_results,
-            "all_results": all_results,  # Return all results for frontend pagination
+            "all_results": all_results,  # Full ranking (id + score) for frontend pagination
             "answer": answer,
             "pagination": {
                 "current_page": page,
@@ -189,13 +348,26 @@ def query(req: QueryRequest):
                 "total_results": total_results,
                 "total_pages": total_pages
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/doc")
+def get_document(id: str = Query(..., description="Document id as returned by /query")):
+    """Return a single indexed document's text."""
+    loaded = app_state["loaded"]
+    if loaded is None:
+        raise HTTPException(status_code=500, detail="Index not loaded on server")
+    retriever = loaded.retriever
+    row = retriever.rows.get(id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Document not found: {id}")
+    return {"id": id, "text": retriever.texts[row]}
+
+
 # Serve static demo files located in rag_app/static
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.isdir(static_dir):
@@ -207,28 +379,46 @@ def root():
     return RedirectResponse(url="/static/index.html")
 
 
+# Files served by /download and /view must live under this directory (symlinks resolved)
+DATA_ROOT = os.path.realpath(os.path.join(os.getcwd(), "data"))
+
+
+def _safe_resolve(file: str):
+    """Resolve a requested path inside DATA_ROOT and stat it once.
+
+    Returns (file_path, stat_result). Raises 403 for paths outside the data
+    directory and 404 for anything that is not an existing regular file.
+    """
+    file_path = os.path.realpath(file)
+    if not os.path.normcase(file_path).startswith(os.path.normcase(DATA_ROOT) + os.sep):
+        logger.warning(f"Access denied: attempted to access file outside data directory: {file}")
+        raise HTTPException(status_code=403, detail="Access denied: file outside data directory")
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail=f"File not found: {file}")
+    return file_path, st
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against our (strong) ETag."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
 @app.get("/download")
 def download_file(
     file: str = Query(..., description="Path to file to download/view"),
-    page: int = Query(1, description="Page number for PDFs (used for navigation hint)")
+    page: int = Query(1, description="Page number for PDFs (used for navigation hint)"),
+    if_none_match: Optional[str] = Header(None),
 ):
     """Download or view a file directly (opens PDFs in browser's native viewer)."""
     # Security: only allow files within the data directory
-    data_dir = os.path.abspath(os.path.join(os.getcwd(), "data"))
-    file_path = os.path.abspath(file)
-
-    try:
-        common = os.path.commonpath([data_dir, file_path])
-    except Exception:
-        common = ""
-
-    if common != data_dir:
-        logger.warning(f"Access denied: attempted to access file outside data directory: {file}")
-        raise HTTPException(status_code=403, detail="Access denied: file outside data directory")
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"File not found: {file}")
-    
+    file_path, st = _safe_resolve(file)
     file_name = os.path.basename(file_path)
     
     # Determine content type based on file extension
@@ -237,102 +427,49 @@ def download_file(
     if file_lower.endswith('.pdf'):
         media_type = "application/pdf"
         # Return PDF inline so browser displays it (not downloads)
-        headers = {"Content-Disposition": f"inline; filename=\"{file_name}\""}
+        disposition = "inline"
         logger.info(f"Serving PDF file: {file_name}, page hint: {page}")
-        return FileResponse(
-            file_path, 
-            media_type=media_type, 
-            filename=file_name,
-            headers=headers
-        )
     elif file_lower.endswith('.docx'):
         media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         # Word docs typically download rather than display inline
-        headers = {"Content-Disposition": f"attachment; filename=\"{file_name}\""}
+        disposition = "attachment"
         logger.info(f"Serving Word document: {file_name}")
-        return FileResponse(
-            file_path, 
-            media_type=media_type, 
-            filename=file_name,
-            headers=headers
-        )
     elif file_lower.endswith('.doc'):
         media_type = "application/msword"
-        headers = {"Content-Disposition": f"attachment; filename=\"{file_name}\""}
+        disposition = "attachment"
         logger.info(f"Serving Word document (legacy): {file_name}")
-        return FileResponse(
-            file_path, 
-            media_type=media_type, 
-            filename=file_name,
-            headers=headers
-        )
     else:
         # For other files, redirect to the text view
         import urllib.parse
         return RedirectResponse(url=f"/view?file={urllib.parse.quote(file)}&line=1")
 
-
-@app.get("/view", response_class=HTMLResponse)
-def view_file(
-    file: str = Query(..., description="Path to file to view"),
-    line: int = Query(1, description="Line number to highlight"),
-    query: str = Query("", description="Search term to highlight")
-):
-    """View a file in the browser with line highlighting."""
-    # Security: only allow files within the data directory
-    data_dir = os.path.abspath(os.path.join(os.getcwd(), "data"))
-    file_path = os.path.abspath(file)
-
-    try:
-        common = os.path.commonpath([data_dir, file_path])
-    except Exception:
-        common = ""
-
-    if common != data_dir:
-        raise HTTPException(status_code=403, detail="Access denied: file outside data directory")
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"File not found: {file}")
-    
-    # Read file content
-    try:
-        if file_path.lower().endswith('.pdf'):
-            content = extract_pdf_text(file_path)
-        else:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading file: {e}")
-    
-    # Build HTML with line numbers and highlighting
-    lines = content.split('\n')
-    file_name = os.path.basename(file_path)
-    
-    import re
-    query_raw = query.strip() if query else ""
-    
-    lines_html = []
-    for i, line_text in enumerate(lines, start=1):
-        escaped_line = html.escape(line_text)
-        
-        # Highlight search term if provided
-        if query_raw:
-            escaped_line = re.sub(
-                f'({re.escape(query_raw)})',
-                r'<mark>\1</mark>',
-                escaped_line,
-                flags=re.IGNORECASE
-            )
-        
-        highlight_class = ' class="highlight"' if i == line else ''
-        line_id = f'id="L{i}"' if i == line else ''
-        lines_html.append(f'<tr{highlight_class} {line_id}><td class="line-no">{i}</td><td class="line-content">{escaped_line}</td></tr>')
-    
-    html_content = f'''<!DOCTYPE html>
+    # PDF viewers re-request the same file often; let the browser revalidate cheaply
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {
+        "Content-Disposition": f"{disposition}; filename=\"{file_name}\"",
+        "Cache-Control": "public, max-age=3600",
+        "ETag": etag,
+    }
+    if _etag_matches(if_none_match, etag):
+        del headers["Content-Disposition"]
+        return Response(status_code=304, headers=headers)
+    # Passing the stat result saves FileResponse a second stat; the body is sent
+    # by the server's zero-copy file path where supported
+    return FileResponse(
+        file_path, 
+        media_type=media_type, 
+        filename=file_name,
+        headers=headers,
+        stat_result=st
+    )
+
+
+# Page skeleton for /view; rows are streamed between the two halves
+_VIEW_HTML_HEAD = '''<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
-    <title>{html.escape(file_name)} - Line {line}</title>
+    <title>{file_name} - Line {line}</title>
     <style>
         :root {{
             --bg: #1e1e1e;
@@ -409,14 +546,15 @@ def view_file(
 </head>
 <body>
     <div class="header">
-        <h1>📄 {html.escape(file_name)}</h1>
+        <h1>📄 {file_name}</h1>
         <div class="info">
-            Line {line} of {len(lines)} | 
+            Line {line} of {num_lines} | 
             <a href="javascript:history.back()" class="back-link">← Back to search</a>
         </div>
     </div>
     <table>
-        {''.join(lines_html)}
+        '''
+_VIEW_HTML_FOOT = '''
     </table>
     <script>
         // Scroll to highlighted line
@@ -427,5 +565,112 @@ def view_file(
     </script>
 </body>
 </html>'''
-    
-    return HTMLResponse(content=html_content)
+
+_SCAN_BLOCK = 1 << 24  # bytes per vectorized newline scan (bounds temporary arrays)
+_ROWS_PER_CHUNK = 1000  # table rows per streamed chunk
+
+
+def _line_spans(mm):
+    r"""Byte (starts, ends) of every line in a mapped text file.
+
+    Uses the same line breaks as read_text_file (\n, \r\n and a lone \r), so line
+    numbers agree with the ones search results link to. The file is scanned in
+    blocks with numpy comparisons instead of decoding it into one big string.
+    """
+    data = np.frombuffer(mm, dtype=np.uint8)
+    n = len(data)
+    starts, ends = [np.zeros(1, dtype=np.int64)], []
+    for off in range(0, n, _SCAN_BLOCK):
+        body = data[off:off + _SCAN_BLOCK]
+        is_cr = body == 0x0D
+        is_lf = body == 0x0A
+        # \r\n ends the line at the \r; its \n (possibly in the next block) is skipped
+        next_lf = np.zeros_like(is_lf)
+        next_lf[:-1] = is_lf[1:]
+        next_lf[-1] = off + len(body) < n and data[off + len(body)] == 0x0A
+        prev_cr = np.empty_like(is_cr)
+        prev_cr[1:] = is_cr[:-1]
+        prev_cr[0] = off > 0 and data[off - 1] == 0x0D
+        brk = np.flatnonzero(is_cr | (is_lf & ~prev_cr))
+        ends.append(brk + off)
+        starts.append(brk + off + 1 + (is_cr & next_lf)[brk])
+    ends.append(np.array([n], dtype=np.int64))
+    del data  # release the buffer export so the mmap can be closed
+    return np.concatenate(starts), np.concatenate(ends)
+
+
+def _view_rows(lines, line: int, mark_re):
+    """Yield the table rows for /view in chunks, highlighting the target line."""
+    rows = []
+    append = rows.append
+    for i, line_text in enumerate(lines, start=1):
+        escaped_line = html.escape(line_text)
+
+        # Highlight search term if provided
+        if mark_re:
+            escaped_line = mark_re.sub(r'<mark>\1</mark>', escaped_line)
+
+        if i == line:
+            append(f'<tr class="highlight" id="L{line}"><td class="line-no">{i}</td><td class="line-content">{escaped_line}</td></tr>')
+        else:
+            append(f'<tr ><td class="line-no">{i}</td><td class="line-content">{escaped_line}</td></tr>')
+        if len(rows) >= _ROWS_PER_CHUNK:
+            yield ''.join(rows)
+            rows.clear()
+    if rows:
+        yield ''.join(rows)
+
+
+@app.get("/view", response_class=HTMLResponse)
+def view_file(
+    file: str = Query(..., description="Path to file to view"),
+    line: int = Query(1, description="Line number to highlight"),
+    query: str = Query("", description="Search term to highlight")
+):
+    """View a file in the browser with line highlighting.
+
+    Text files are memory-mapped and streamed out a chunk of rows at a time, so
+    large logs are never decoded into a single string.
+    """
+    # Security: only allow files within the data directory
+    file_path, st = _safe_resolve(file)
+    file_name = os.path.basename(file_path)
+
+    query_raw = query.strip() if query else ""
+    # Compile the highlight pattern once instead of per line
+    mark_re = re.compile(f'({re.escape(query_raw)})', re.IGNORECASE) if query_raw else None
+
+    # Read file content
+    mm = None
+    try:
+        if file_path.lower().endswith('.pdf'):
+            lines = extract_pdf_text(file_path).split('\n')
+            num_lines = len(lines)
+        elif st.st_size == 0:
+            lines = ['']
+            num_lines = 1
+        else:
+            with open(file_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            starts, ends = _line_spans(mm)
+            num_lines = len(starts)
+    except Exception as e:
+        if mm is not None:
+            mm.close()
+        raise HTTPException(status_code=500, detail=f"Error reading file: {e}")
+
+    def decoded_lines():
+        # Decode one line at a time, only as it is emitted
+        try:
+            for b in range(0, num_lines, _ROWS_PER_CHUNK):
+                for s, e in zip(starts[b:b + _ROWS_PER_CHUNK].tolist(), ends[b:b + _ROWS_PER_CHUNK].tolist()):
+                    yield str(mm[s:e], 'utf-8', 'ignore')
+        finally:
+            mm.close()
+
+    def generate():
+        yield _VIEW_HTML_HEAD.format(file_name=html.escape(file_name), line=line, num_lines=num_lines)
+        yield from _view_rows(decoded_lines() if mm is not None else lines, line, mark_re)
+        yield _VIEW_HTML_FOOT.format(line=line)
+
+    return StreamingResponse(generate(), media_type="text/html")
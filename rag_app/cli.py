@@ -1,28 +1,64 @@
 import argparse
+import json
+import os
+import urllib.request
 from . import indexer, retriever, llm
 from .config import DEFAULT_INDEX_PATH, DATA_DIR
 
 def cmd_index(args):
-    index = indexer.build_index(args.data_dir, args.index_path, model_name=args.model)
+    index = indexer.build_index(args.data_dir, args.index_path, model_name=args.model, jobs=args.jobs,
+                                 incremental=args.incremental)
     print(f"Index built: {len(index['docs'])} docs, saved to {args.index_path}")
 
 def cmd_query(args):
+    if args.server:
+        return query_server(args)
     index = indexer.load_index(args.index_path)
     vec = index.get('vectorizer')
     if vec is None:
         raise RuntimeError("Index missing vectorizer; re-build index")
-    qv = vec.transform([args.q]).toarray()
+    qv = vec.transform([args.q])
     ret = retriever.Retriever.from_index(index)
     idxs, sims = ret.query(qv, top_k=args.k)
-    contexts = [index['docs'][i]['text'] for i in idxs]
+    contexts = [ret.texts[i] for i in idxs]
+    doc_ids = [ret.ids[i] for i in idxs]
     print("Top matches:")
-    for i, s in zip(idxs, sims):
-        print(f"- {index['docs'][i]['id']} (score={s:.3f})")
-    doc_ids = [index['docs'][i]['id'] for i in idxs]
-    ans = llm.answer_query(args.q, contexts, provider=args.provider, doc_ids=doc_ids, top_k=args.k)
+    for doc_id, s in zip(doc_ids, sims):
+        print(f"- {doc_id} (score={s:.3f})")
+    # Only the first page is printed, so the simple provider can stop scanning there
+    try:
+        ans = llm.answer_query(args.q, contexts, provider=args.provider, doc_ids=doc_ids, top_k=args.k, page=1)
+    except llm.ProviderError as e:
+        ans = str(e)
     print('\n==== ANSWER ===\n')
     print(ans)
 
+def query_server(args):
+    """Send the query to a running `serve` instance instead of loading the index locally."""
+    body = json.dumps({"q": args.q, "per_page": args.k, "page": 1, "provider": args.provider}).encode('utf-8')
+    req = urllib.request.Request(
+        args.server.rstrip('/') + '/query',
+        data=body,
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(req) as resp:
+        data = json.load(resp)
+    print("Top matches:")
+    for r in data['results']:
+        print(f"- {r['id']} (score={r['score']:.3f})")
+    print('\n==== ANSWER ===\n')
+    print(data['answer'])
+
+def cmd_serve(args):
+    # The API reads its paths from the environment at import time
+    os.environ['RAG_INDEX_PATH'] = args.index_path
+    os.environ['RAG_DATA_DIR'] = args.data_dir
+    import uvicorn
+    from .api import app
+    # One worker process: the index and vectorizer are loaded once and stay warm
+    # across requests instead of being reloaded on every CLI invocation
+    uvicorn.run(app, host=args.host, port=args.port, workers=1)
+
 def main():
     p = argparse.ArgumentParser(prog='rag_app', description='RAG Search Application CLI')
     sp = p.add_subparsers(dest='cmd')
@@ -30,7 +66,9 @@ def main():
     p_index = sp.add_parser('index', help='Build search index from files')
     p_index.add_argument('--data_dir', default=DATA_DIR, help='Directory containing files to index')
     p_index.add_argument('--index_path', default=DEFAULT_INDEX_PATH, help='Path to save the index')
-    p_index.add_argument('--model', default='tfidf', help='Embedding model (default: tfidf)')
+    p_index.add_argument('--model', default='tfidf', choices=['tfidf', 'hashing'], help='Embedding model (default: tfidf; hashing skips building a vocabulary)')
+    p_index.add_argument('--jobs', type=int, default=None, help='Worker processes for PDF/Word extraction (default: CPU count, 1 = serial)')
+    p_index.add_argument('--incremental', action='store_true', help='Only re-extract new/changed files, reusing the existing index')
     p_index.set_defaults(func=cmd_index)
 
     p_q = sp.add_parser('query', help='Query the search index')
@@ -38,8 +76,16 @@ def main():
     p_q.add_argument('--q', required=True, help='Search query')
     p_q.add_argument('-k', type=int, default=5, help='Number of results to return')
     p_q.add_argument('--provider', default='simple', help='LLM provider (simple, openai, local, gpt4all)')
+    p_q.add_argument('--server', default=None, help='URL of a running `serve` instance to query (e.g. http://127.0.0.1:8000)')
     p_q.set_defaults(func=cmd_query)
 
+    p_serve = sp.add_parser('serve', help='Run the API server with the index kept loaded')
+    p_serve.add_argument('--host', default='127.0.0.1', help='Host to bind')
+    p_serve.add_argument('--port', type=int, default=8000, help='Port to bind')
+    p_serve.add_argument('--index_path', default=DEFAULT_INDEX_PATH, help='Path to the index file')
+    p_serve.add_argument('--data_dir', default=DATA_DIR, help='Directory used by /rebuild-index')
+    p_serve.set_defaults(func=cmd_serve)
+
     args = p.parse_args()
     if not hasattr(args, 'func'):
         p.print_help()
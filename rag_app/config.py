@@ -43,6 +43,10 @@ logger.info(f"Logging initialized. Log file: {LOG_FILE}")
 DATA_DIR = os.path.join(os.getcwd(), "data")
 DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, "index.joblib")
 
+# On-disk cache of extracted PDF text, keyed by file path + mtime/size (empty string disables).
+# Kept in a hidden directory so it is never picked up as indexable content.
+EXTRACT_CACHE_DIR = os.environ.get("RAG_EXTRACT_CACHE_DIR", os.path.join(DATA_DIR, ".cache", "pdf_text"))
+
 # LLM provider selection: 'openai', 'local', 'gpt4all', or 'simple'
 LLM_PROVIDER = os.environ.get("RAG_LLM_PROVIDER", "simple")  # Default to simple for offline use
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
@@ -52,5 +56,15 @@ MAX_QUERY_LENGTH = int(os.environ.get("RAG_MAX_QUERY_LENGTH", "500"))
 MAX_RESULTS_PER_PAGE = int(os.environ.get("RAG_MAX_RESULTS_PER_PAGE", "100"))
 DEFAULT_RESULTS_PER_PAGE = int(os.environ.get("RAG_DEFAULT_RESULTS_PER_PAGE", "10"))
 
+# Upper bound on the retrieved text put into an LLM prompt, in characters (0 = no limit).
+# Contexts are added in ranking order, so the least relevant text is cut first.
+LLM_MAX_CONTEXT_CHARS = int(os.environ.get("RAG_LLM_MAX_CONTEXT_CHARS", "12000"))
+
+# In-process LRU of /query results for the server-loaded index (0 disables), bounded
+# both by entry count and by approximate memory: simple-provider answers carry every
+# hit's HTML and can run to megabytes each
+QUERY_CACHE_SIZE = int(os.environ.get("RAG_QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_MAX_MB = int(os.environ.get("RAG_QUERY_CACHE_MAX_MB", "128"))
+
 # Timeouts
 OPENAI_TIMEOUT = int(os.environ.get("RAG_OPENAI_TIMEOUT", "30"))
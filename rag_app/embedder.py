@@ -1,28 +1,47 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
 import numpy as np
 import os
 
 # Configurable max features for TF-IDF vectorizer
 DEFAULT_MAX_FEATURES = int(os.environ.get("RAG_MAX_FEATURES", "5000"))
+# Size of the hashed feature space for the 'hashing' model
+DEFAULT_HASH_FEATURES = int(os.environ.get("RAG_HASH_FEATURES", str(2 ** 18)))
 
 class Embedder:
     """TF-IDF vectorizer for document embeddings.
     
     Args:
-        model_name: Name of the embedding model (currently only 'tfidf' supported)
+        model_name: 'tfidf' (default) or 'hashing'. 'hashing' hashes terms into a
+            fixed feature space and weights them with TfidfTransformer, so fitting
+            builds no vocabulary and new terms in later documents still count.
         vectorizer: Optional pre-configured TfidfVectorizer
         max_features: Maximum number of features (default: 5000, configurable via RAG_MAX_FEATURES env var)
     """
     def __init__(self, model_name: str = "tfidf", vectorizer=None, max_features: int = None):
         self.model_name = model_name
         self.max_features = max_features or DEFAULT_MAX_FEATURES
+        if vectorizer is None and model_name == "hashing":
+            vectorizer = Pipeline([
+                ('hash', HashingVectorizer(
+                    n_features=DEFAULT_HASH_FEATURES,
+                    lowercase=True,
+                    stop_words='english',
+                    ngram_range=(1, 2),
+                    alternate_sign=False,  # Keep counts non-negative for TF-IDF weighting
+                    norm=None,
+                    dtype=np.float32
+                )),
+                ('tfidf', TfidfTransformer()),
+            ])
         self.vectorizer = vectorizer or TfidfVectorizer(
             max_features=self.max_features, 
             lowercase=True, 
             stop_words='english',
             ngram_range=(1, 2),  # Include bigrams for better matching
             min_df=1,  # Include rare terms
-            max_df=0.95  # Exclude very common terms
+            max_df=0.95,  # Exclude very common terms
+            dtype=np.float32  # Half the bytes of float64; ample precision for ranking
         )
 
     def fit(self, texts):
@@ -30,8 +49,18 @@ class Embedder:
         self.vectorizer.fit(texts)
         return self
 
+    def fit_embed(self, texts):
+        """Fit on texts and return their sparse CSR embeddings in a single pass."""
+        return self.vectorizer.fit_transform(texts)
+
     def embed(self, texts):
         """Return 2D numpy array of embeddings for list of texts."""
         if isinstance(texts, str):
             texts = [texts]
-        return self.vectorizer.transform(texts).toarray()
+        return self.embed_sparse(texts).toarray()
+
+    def embed_sparse(self, texts):
+        """Return sparse CSR matrix of embeddings for list of texts (no densification)."""
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.vectorizer.transform(texts)
@@ -1,37 +1,197 @@
 import os
-from typing import List
-import glob
+from typing import Iterator, List, Optional
+import fnmatch
+import hashlib
+import json
+import mmap
 import joblib
 import numpy as np
+from scipy import sparse
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .config import EXTRACT_CACHE_DIR
 from .embedder import Embedder
 
 logger = logging.getLogger(__name__)
 
+# Optional extraction libraries, imported once by load_extractors() (None = not installed)
+_pdfium = None
+_PyPDF2 = None
+_docx_Document = None
+_extractors_loaded = False
+
+# PDFium is not thread-safe and pypdfium2 does not serialize calls into it, while
+# the server extracts from several threads (/view, searches, background rebuilds).
+# Only one PdfDocument is open at a time per process; worker processes have their own.
+_pdfium_lock = threading.Lock()
+
+
+def _reset_pdfium_lock():
+    # A forked extraction worker would otherwise inherit the lock held by whichever
+    # thread was inside PDFium at fork time, and block on it forever
+    global _pdfium_lock
+    _pdfium_lock = threading.Lock()
+
+
+# os.register_at_fork only exists on Unix; Windows spawns workers, which re-create the lock
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pdfium_lock)
+
+
+def load_extractors():
+    """Import the optional PDF/Word libraries once and keep them in module globals.
+
+    The extractors call this lazily; the API calls it at startup so the import
+    cost is not paid inside the first rebuild.
+    """
+    global _pdfium, _PyPDF2, _docx_Document, _extractors_loaded
+    if _extractors_loaded:
+        return
+    try:
+        import pypdfium2 as _pdfium
+    except ImportError:
+        _pdfium = None
+    try:
+        import PyPDF2 as _PyPDF2
+    except ImportError:
+        _PyPDF2 = None
+    try:
+        from docx import Document as _docx_Document
+    except ImportError:
+        _docx_Document = None
+    _extractors_loaded = True
+
+def _pdf_pages_pdfium(file_path: str) -> List[str]:
+    """Page texts via pypdfium2 (native PDFium), one document at a time per process."""
+    pages = []
+    with _pdfium_lock:
+        pdf = _pdfium.PdfDocument(file_path)
+        try:
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_range() or '')
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    # PDFium separates lines with \r\n
+    return [t.replace('\r\n', '\n').replace('\r', '\n') for t in pages]
+
+
+def _pdf_pages_pypdf2(file_path: str) -> List[str]:
+    """Page texts via PyPDF2 (pure Python fallback)."""
+    with open(file_path, 'rb') as f:
+        reader = _PyPDF2.PdfReader(f)
+        return [page.extract_text() or '' for page in reader.pages]
+
+
+def _pdf_cache_file(file_path: str) -> str:
+    key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(EXTRACT_CACHE_DIR, key + '.txt')
+
+
+def _read_pdf_cache(file_path: str, signature: str) -> Optional[str]:
+    """Cached text for file_path if it was extracted from the same (mtime, size)."""
+    try:
+        with open(_pdf_cache_file(file_path), 'r', encoding='utf-8', newline='') as f:
+            if f.readline() != signature + '\n':
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_pdf_cache(file_path: str, signature: str, text: str):
+    # One entry per PDF (overwritten when it changes); write-then-rename so a
+    # concurrent reader never sees a partial file
+    cache_file = _pdf_cache_file(file_path)
+    try:
+        os.makedirs(EXTRACT_CACHE_DIR, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            f.write(signature + '\n')
+            f.write(text)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        logger.debug(f"Could not cache PDF text for {file_path}: {e}")
+
+
+def cached_pdf_text(file_path: str, signature) -> Optional[str]:
+    """Text extract_pdf_text cached on disk for a PDF with this (mtime_ns, size), or None."""
+    if not EXTRACT_CACHE_DIR:
+        return None
+    return _read_pdf_cache(file_path, f"{signature[0]} {signature[1]}")
+
+
 def extract_pdf_text(file_path: str) -> str:
-    """Extract text from a PDF file for indexing."""
+    """Extract text from a PDF file for indexing.
+
+    Uses pypdfium2 (native PDFium) when installed, falling back to PyPDF2.
+    Extracted text is cached on disk by (path, mtime, size), so an unchanged PDF
+    is parsed once rather than on every rebuild or search.
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return ""
+    signature = f"{st.st_mtime_ns} {st.st_size}"
+    if EXTRACT_CACHE_DIR:
+        cached = _read_pdf_cache(file_path, signature)
+        if cached is not None:
+            return cached
+
+    load_extractors()
+    if _pdfium is None and _PyPDF2 is None:
+        return ""  # Skip PDF if no PDF library is installed
     try:
-        import PyPDF2
+        if _pdfium is not None:
+            pages = _pdf_pages_pdfium(file_path)
+        else:
+            pages = _pdf_pages_pypdf2(file_path)
         text_parts = []
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page_num, page in enumerate(reader.pages, start=1):
-                page_text = page.extract_text() or ''
-                for line in page_text.split('\n'):
-                    text_parts.append(f"[Page {page_num}] {line}")
-        return '\n'.join(text_parts)
-    except ImportError:
-        return ""  # Skip PDF if PyPDF2 not installed
+        for page_num, page_text in enumerate(pages, start=1):
+            # Prefix every line of the page with one str.replace instead of a per-line loop
+            prefix = f"[Page {page_num}] "
+            text_parts.append(prefix + page_text.replace('\n', '\n' + prefix))
+        text = '\n'.join(text_parts)
     except Exception:
         return ""  # Skip unreadable PDFs
 
+    if EXTRACT_CACHE_DIR:
+        _write_pdf_cache(file_path, signature, text)
+    return text
+
+
+def read_text_file(file_path: str) -> str:
+    """Read a text file as UTF-8, dropping undecodable bytes and normalizing newlines.
+
+    Decodes straight from a read-only mmap, so the file is not first copied into a
+    bytes object on the Python heap (peak memory ~ the decoded str, not twice it).
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return ""  # Empty file: zero-length mappings are not allowed
+        with mm:
+            text = str(mm, 'utf-8', 'ignore')
+    # Match text-mode reading (universal newlines)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
 
 def extract_docx_text(file_path: str) -> str:
     """Extract text from a Word document (.docx) for indexing."""
+    load_extractors()
+    if _docx_Document is None:
+        logger.warning("python-docx not installed. Install with: pip install python-docx")
+        return ""  # Skip DOCX if python-docx not installed
     try:
-        from docx import Document
         text_parts = []
-        doc = Document(file_path)
+        doc = _docx_Document(file_path)
         
         # Extract text from paragraphs
         para_num = 0
@@ -50,88 +210,333 @@ def extract_docx_text(file_path: str) -> str:
                     text_parts.append(f"[Table {table_num}] {row_text}")
         
         return '\n'.join(text_parts)
-    except ImportError:
-        logger.warning("python-docx not installed. Install with: pip install python-docx")
-        return ""  # Skip DOCX if python-docx not installed
     except Exception as e:
         logger.warning(f"Error reading Word document {file_path}: {e}")
         return ""  # Skip unreadable DOCX files
 
-def load_text_files(data_dir: str, patterns: List[str] = None) -> List[dict]:
-    """Load all text-based files from data directory.
-    
-    Args:
-        data_dir: Directory to search for files
-        patterns: List of glob patterns to match (default: common text file extensions)
+BINARY_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+# Incremental rebuilds keep the vocabulary fitted by the last full build; force a
+# full refit after this many incremental updates so new terms get picked up
+FULL_REFIT_EVERY = int(os.environ.get("RAG_FULL_REFIT_EVERY", "10"))
+
+
+def _extract_one(path: str) -> Optional[dict]:
+    """Read or extract a single file into a ``{"id", "text"}`` doc.
+
+    Module-level so it can be pickled into worker processes.
+    Returns None for empty or unreadable files.
     """
+    try:
+        # Handle PDF files specially
+        if path.lower().endswith('.pdf'):
+            text = extract_pdf_text(path)
+        # Handle Word documents
+        elif path.lower().endswith(('.docx', '.doc')):
+            text = extract_docx_text(path)
+        else:
+            text = read_text_file(path).strip()
+        if text:
+            return {"id": path, "text": text}
+    except Exception as e:
+        logger.debug(f"Skipping file {path}: {e}")
+    return None
+
+# Default file extensions to index: common text-based files plus PDF and Word docs
+DEFAULT_EXTENSIONS = frozenset({
+    ".txt", ".md", ".csv", ".json", ".xml", ".log",
+    ".py", ".java", ".js", ".ts", ".html", ".css",
+    ".yaml", ".yml", ".ini", ".cfg", ".conf", ".err", ".out",
+    ".sql", ".sh", ".bat", ".ps1", ".c", ".cpp", ".h",
+    ".pdf", ".docx", ".doc",
+})
+
+
+def _iter_files(root: str, match) -> Iterator[os.DirEntry]:
+    """Recursively yield DirEntry objects for files under root whose name satisfies match(name).
+
+    One os.scandir pass per directory (DirEntry caches the file type, so no extra
+    stat per entry). Hidden files and directories are skipped, as glob's '**' does.
+    """
+    try:
+        entries = os.scandir(root)
+    except OSError as e:
+        logger.debug(f"Skipping directory {root}: {e}")
+        return
+    with entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                yield from _iter_files(entry.path, match)
+            elif entry.is_file() and match(entry.name):
+                yield entry
+
+
+def _discover_files(data_dir: str, patterns: List[str] = None) -> List[os.DirEntry]:
+    """Find indexable files under data_dir (see load_text_files for `patterns`)."""
     if patterns is None:
-        # Default to common text-based file extensions (including Word docs)
-        patterns = ["*.txt", "*.md", "*.csv", "*.json", "*.xml", "*.log", 
-                    "*.py", "*.java", "*.js", "*.ts", "*.html", "*.css",
-                    "*.yaml", "*.yml", "*.ini", "*.cfg", "*.conf", "*.err", "*.out",
-                    "*.sql", "*.sh", "*.bat", "*.ps1", "*.c", "*.cpp", "*.h", 
-                    "*.pdf", "*.docx", "*.doc"]
-    
-    files = []
-    for pattern in patterns:
-        files.extend(glob.glob(os.path.join(data_dir, "**", pattern), recursive=True))
-    
-    # Remove duplicates while preserving order
-    files = list(dict.fromkeys(files))
-    
-    docs = []
-    for p in files:
+        def match(name):
+            return os.path.splitext(name)[1].lower() in DEFAULT_EXTENSIONS
+    else:
+        def match(name):
+            return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    # Single walk of the tree, so no duplicates to remove
+    return list(_iter_files(data_dir, match))
+
+
+def _extract_files(files: List[str], jobs: Optional[int] = None) -> List[dict]:
+    """Extract docs from the given paths, keeping their order and dropping empty files."""
+    # PDF/Word parsing is CPU-bound pure Python, so fan it out across processes;
+    # plain text files are read in this process while the workers parse
+    binary_files = [p for p in files if p.lower().endswith(BINARY_EXTENSIONS)]
+    executor = pending = None
+    workers = min(len(binary_files), jobs or os.cpu_count() or 1)
+    if workers > 1:
+        # A few tasks per worker keeps the load balanced without one IPC round-trip per file
+        chunksize = max(1, len(binary_files) // (workers * 4))
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            pending = executor.map(_extract_one, binary_files, chunksize=chunksize)  # submits all files now
+        except Exception as e:
+            logger.warning(f"Parallel extraction unavailable, falling back to serial: {e}")
+
+    extracted = {p: _extract_one(p) for p in files if not p.lower().endswith(BINARY_EXTENSIONS)}
+    if executor is not None:
         try:
-            # Handle PDF files specially
-            if p.lower().endswith('.pdf'):
-                text = extract_pdf_text(p)
-            # Handle Word documents
-            elif p.lower().endswith(('.docx', '.doc')):
-                text = extract_docx_text(p)
-            else:
-                with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                    text = f.read().strip()
-            if text:  # Only include non-empty files
-                docs.append({"id": p, "text": text})
+            if pending is not None:
+                extracted.update(zip(binary_files, pending))
         except Exception as e:
-            logger.debug(f"Skipping file {p}: {e}")
-            pass
+            logger.warning(f"Parallel extraction failed, falling back to serial: {e}")
+        finally:
+            executor.shutdown()
+
+    docs = []
+    for p in files:
+        doc = extracted[p] if p in extracted else _extract_one(p)
+        if doc:  # Only include non-empty files
+            docs.append(doc)
     return docs
 
-def build_index(data_dir: str, index_path: str, model_name: str = "tfidf"):
+
+def _file_signature(entry: os.DirEntry):
+    """(mtime_ns, size) of a discovered file, or None if it vanished."""
+    try:
+        st = entry.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _manifest(signatures: dict) -> dict:
+    """{path: (mtime_ns, size)} of every discovered file, stored with the index."""
+    return {p: sig for p, sig in signatures.items() if sig is not None}
+
+
+def load_text_files(data_dir: str, patterns: List[str] = None, jobs: Optional[int] = None) -> List[dict]:
+    """Load all text-based files from data directory.
+    
+    Args:
+        data_dir: Directory to search for files
+        patterns: List of glob patterns to match file names against
+                  (default: DEFAULT_EXTENSIONS, compared case-insensitively)
+        jobs: Worker processes for PDF/Word extraction (default: CPU count; 1 = serial)
+    """
+    return _extract_files([e.path for e in _discover_files(data_dir, patterns)], jobs)
+
+def build_index(data_dir: str, index_path: str, model_name: str = "tfidf", jobs: Optional[int] = None,
+                incremental: bool = False):
     """Build search index from files in data directory.
     
     Args:
         data_dir: Directory containing files to index
         index_path: Path to save the index file
-        model_name: Embedding model name (default: tfidf)
+        model_name: Embedding model name: tfidf (default) or hashing
+        jobs: Worker processes for PDF/Word extraction (default: CPU count; 1 = serial)
+        incremental: Reuse the existing index at index_path and only re-extract files
+                     whose mtime/size changed (falls back to a full build when needed)
     
     Returns:
         dict: Index containing docs, vectors, model_name, and vectorizer
     """
     logger.info(f"Building index from {data_dir}")
-    docs = load_text_files(data_dir)
+    entries = _discover_files(data_dir)
+    signatures = {e.path: _file_signature(e) for e in entries}
+
+    if incremental:
+        index = _update_index(index_path, model_name, signatures, jobs)
+        if index is not None:
+            return index
+
+    docs = _extract_files([e.path for e in entries], jobs)
     texts = [d["text"] for d in docs]
     if len(texts) == 0:
         raise RuntimeError(f"No text files found in {data_dir}")
 
     logger.info(f"Found {len(docs)} documents, creating embeddings...")
     emb = Embedder(model_name)
-    emb.fit(texts)
-    vectors = emb.embed(texts)
+    vectors = emb.fit_embed(texts)  # CSR: TF-IDF rows are mostly zeros
 
     index = {
         "docs": docs,
         "vectors": vectors,
         "model_name": model_name,
         "vectorizer": emb.vectorizer,
+        "manifest": _manifest(signatures),
+        "incremental_updates": 0,
     }
-    os.makedirs(os.path.dirname(index_path), exist_ok=True)
-    joblib.dump(index, index_path)
+    save_index(index, index_path)
     logger.info(f"Index saved to {index_path}")
     return index
 
 
+def _update_index(index_path: str, model_name: str, signatures: dict, jobs: Optional[int]) -> Optional[dict]:
+    """Refresh an existing index in place of a full build.
+
+    Rows of unchanged files are kept as-is; new and modified files are extracted and
+    transformed with the already-fitted vectorizer (so the vocabulary stays fixed);
+    deleted files are dropped. Returns None when a full build is required instead:
+    no usable previous index, a different model, no unchanged rows left to keep, or
+    FULL_REFIT_EVERY updates since the vocabulary was last fitted.
+    """
+    try:
+        old = load_index(index_path)
+    except FileNotFoundError:
+        return None
+    manifest = old.get("manifest")
+    if manifest is None or old.get("model_name") != model_name:
+        return None
+    # The manifest covers every file seen last time, including ones that produced no
+    # text, so those are not re-extracted on every run either
+    changed = [p for p, sig in signatures.items() if sig is not None and manifest.get(p) != sig]
+    keep_rows = [i for i, d in enumerate(old["docs"])
+                 if signatures.get(d["id"]) is not None and manifest.get(d["id"]) == signatures[d["id"]]]
+    if not changed and len(keep_rows) == len(old["docs"]):
+        logger.info("Index is up to date")
+        return old
+    if not keep_rows:
+        # Nothing in common with the previous corpus (e.g. a different data_dir), so
+        # its vocabulary would give the new text near-empty vectors
+        logger.info("No unchanged docs to keep; doing a full rebuild")
+        return None
+    updates = old.get("incremental_updates", 0) + 1
+    if updates >= FULL_REFIT_EVERY:
+        logger.info("Refitting vocabulary with a full rebuild")
+        return None
+
+    logger.info(f"Incremental rebuild: {len(keep_rows)} docs unchanged, {len(changed)} files to extract, "
+                f"{len(old['docs']) - len(keep_rows)} docs removed or replaced")
+    new_docs = _extract_files(changed, jobs)
+    docs = [old["docs"][i] for i in keep_rows] + new_docs
+    parts = [old["vectors"][keep_rows]]
+    if new_docs:
+        parts.append(old["vectorizer"].transform([d["text"] for d in new_docs]))
+    index = {
+        "docs": docs,
+        "vectors": sparse.vstack(parts, format="csr"),
+        "model_name": model_name,
+        "vectorizer": old["vectorizer"],
+        "manifest": _manifest(signatures),
+        "incremental_updates": updates,
+    }
+    save_index(index, index_path)
+    logger.info(f"Index saved to {index_path}")
+    return index
+
+
+# Index on-disk layout (format 2): the bulky parts are stored next to index_path
+# in plain formats, and index_path itself only holds a small joblib header.
+INDEX_FORMAT = 2
+VECTORS_SUFFIX = ".vectors.npz"
+DOCS_SUFFIX = ".docs.jsonl"
+DOCS_ARROW_SUFFIX = ".docs.arrow"
+
+
+def _write_docs(docs: List[dict], index_path: str, tmp: str = "") -> str:
+    """Write the docs side file (with tmp appended to its name) and return its suffix.
+
+    Uses an uncompressed Arrow IPC (Feather v2) table with id/text columns when
+    pyarrow is installed, since it loads several times faster than parsing JSON
+    lines; otherwise falls back to JSONL.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        with open(index_path + DOCS_SUFFIX + tmp, "w", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc, ensure_ascii=False))
+                f.write("\n")
+        return DOCS_SUFFIX
+    table = pa.table({
+        "id": pa.array([d["id"] for d in docs], type=pa.string()),
+        "text": pa.array([d["text"] for d in docs], type=pa.large_string()),
+    })
+    # Uncompressed so the reader can memory-map it instead of decompressing
+    feather.write_feather(table, index_path + DOCS_ARROW_SUFFIX + tmp, compression="uncompressed")
+    return DOCS_ARROW_SUFFIX
+
+
+def _read_docs(index_path: str, suffix: str) -> List[dict]:
+    if suffix == DOCS_ARROW_SUFFIX:
+        try:
+            import pyarrow.feather as feather
+        except ImportError:
+            raise RuntimeError(f"Index {index_path} stores docs in Arrow format; install pyarrow or rebuild the index")
+        table = feather.read_table(index_path + DOCS_ARROW_SUFFIX, memory_map=True)
+        ids = table.column("id").to_pylist()
+        texts = table.column("text").to_pylist()
+        return [{"id": doc_id, "text": text} for doc_id, text in zip(ids, texts)]
+    with open(index_path + DOCS_SUFFIX, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def save_index(index: dict, index_path: str):
+    """Save an index as a small joblib header plus vector and doc side files.
+
+    The sparse vectors go to ``<index_path>.vectors.npz`` (scipy, uncompressed) and
+    the docs to ``<index_path>.docs.arrow`` (or ``.docs.jsonl`` without pyarrow);
+    only the header (model name and fitted vectorizer) is pickled. Every file is
+    written under a temporary name and then renamed into place, header last, so a
+    failure while writing leaves the previous index intact and readers never see a
+    partially written file.
+    """
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp = f".{os.getpid()}.tmp"
+    try:
+        # save_npz appends .npz to a path that lacks it, so hand it an open file
+        with open(index_path + VECTORS_SUFFIX + tmp, "wb") as f:
+            sparse.save_npz(f, sparse.csr_matrix(index["vectors"]), compressed=False)
+        docs_suffix = _write_docs(index["docs"], index_path, tmp)
+        vectorizer = index["vectorizer"]
+        # Older scikit-learn keeps every pruned term in stop_words_; it is only for
+        # introspection and can dwarf the rest of the pickle
+        if getattr(vectorizer, "stop_words_", None) is not None:
+            vectorizer.stop_words_ = None
+        header = {
+            "format": INDEX_FORMAT,
+            "model_name": index["model_name"],
+            "vectorizer": vectorizer,
+            "num_docs": len(index["docs"]),
+            "manifest": index.get("manifest"),
+            "incremental_updates": index.get("incremental_updates", 0),
+            "docs_file": docs_suffix,
+        }
+        joblib.dump(header, index_path + tmp)
+        for suffix in (VECTORS_SUFFIX, docs_suffix, ""):
+            os.replace(index_path + suffix + tmp, index_path + suffix)
+    finally:
+        # Temporary files are only left behind by a failed save
+        for suffix in (VECTORS_SUFFIX, DOCS_SUFFIX, DOCS_ARROW_SUFFIX, ""):
+            if os.path.exists(index_path + suffix + tmp):
+                os.remove(index_path + suffix + tmp)
+    # Drop a docs file left over in the other format
+    stale = DOCS_SUFFIX if docs_suffix == DOCS_ARROW_SUFFIX else DOCS_ARROW_SUFFIX
+    if os.path.exists(index_path + stale):
+        os.remove(index_path + stale)
+
+
 def load_index(index_path: str) -> dict:
     """Load index from file.
     
@@ -144,4 +549,24 @@ def load_index(index_path: str) -> dict:
     if not os.path.exists(index_path):
         raise FileNotFoundError(f"Index file not found: {index_path}")
     logger.debug(f"Loading index from {index_path}")
-    return joblib.load(index_path)
+    header = joblib.load(index_path)
+    if "docs" in header:
+        return header  # Single-pickle index written by older versions
+    vectors = sparse.load_npz(index_path + VECTORS_SUFFIX).tocsr()
+    docs = _read_docs(index_path, header.get("docs_file", DOCS_SUFFIX))
+    # Rows map to docs by position, so files from different saves (e.g. read while
+    # a rebuild was renaming them into place) must not be combined
+    num_docs = header.get("num_docs", len(docs))
+    if not num_docs == len(docs) == vectors.shape[0]:
+        raise RuntimeError(
+            f"Index {index_path} is inconsistent: header lists {num_docs} docs, side files hold "
+            f"{len(docs)} docs and {vectors.shape[0]} vectors; rebuild the index"
+        )
+    return {
+        "docs": docs,
+        "vectors": vectors,
+        "model_name": header["model_name"],
+        "vectorizer": header["vectorizer"],
+        "manifest": header.get("manifest"),
+        "incremental_updates": header.get("incremental_updates", 0),
+    }
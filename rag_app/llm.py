@@ -1,10 +1,23 @@
+import asyncio
+import html
 import os
 import re
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from io import StringIO
 from typing import List, Optional
 import logging
 
-from .config import OPENAI_API_KEY
-from .indexer import extract_pdf_text  # Import from indexer to avoid duplication
+from .config import LLM_MAX_CONTEXT_CHARS, OPENAI_API_KEY
+from .indexer import cached_pdf_text, extract_pdf_text  # Import from indexer to avoid duplication
+
+try:
+    import hyperscan
+except ImportError:  # Optional: simple_synthesizer falls back to re
+    hyperscan = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,6 +29,258 @@ LOCAL_LLM_MODEL_PATH = os.environ.get("LOCAL_LLM_MODEL_PATH", os.path.join(os.ge
 MAX_QUERY_LENGTH = int(os.environ.get("RAG_MAX_QUERY_LENGTH", "500"))
 
 
+
+class ProviderError(Exception):
+    """An LLM provider could not produce an answer; str(e) explains why for the user.
+
+    Raised instead of returning the message as the answer, so callers can tell a
+    failure from a real answer (the API does not cache failures).
+    """
+
+
+# Location markers written by the extractors, compiled once rather than per match
+_PAGE_MARKER_RE = re.compile(r'^\[Page \d+\]\s*')
+_PAGE_TAG_RE = re.compile(r'\[Page (\d+)\]')
+_PARA_TAG_RE = re.compile(r'\[Para (\d+)\]')
+_TABLE_TAG_RE = re.compile(r'\[Table (\d+)\]')
+
+# Document pre-check for simple_synthesizer: with '-' and whitespace removed (the
+# separators the search pattern may skip) and case folded, any matching line must
+# contain the query literally. U+0307 is dropped and dotless i mapped to 'i' so the
+# I/i/İ/ı family that re.IGNORECASE treats as equal also compares equal here.
+_PREFILTER_TABLE = {c: None for c in range(0x3001) if chr(c).isspace()}
+_PREFILTER_TABLE.update({ord('-'): None, 0x307: None, 0x131: 'i'})
+
+
+def _prefilter_key(text: str) -> str:
+    return text.casefold().translate(_PREFILTER_TABLE)
+
+
+# HTML for one simple_synthesizer hit; filled with str.format_map
+_RESULT_TMPL = (
+    '<div class="result-item">'
+    '<div class="result-file">'
+    '<a href="/view?file={path}&line={line_no}&query={query}" target="_blank" title="View extracted text at line {line_no}">'
+    '📄 {name}</a>'
+    '<span class="result-location"> : Line {line_no}{page_info}</span>'
+    '{doc_link}'
+    '</div>'
+    '<div class="result-text">{text}</div>'
+    '</div>'
+)
+_PDF_LINK_TMPL = ' <a href="/download?file={path}&page={page}#page={page}" target="_blank" class="pdf-link" title="Open PDF in browser">📖 Open PDF</a>'
+_DOCX_LINK_TMPL = ' <a href="/download?file={path}" target="_blank" class="pdf-link" title="Download Word document">📝 Open Doc</a>'
+
+
+class _DocView:
+    """Per-document data simple_synthesizer reuses across queries."""
+    __slots__ = ('source', 'text', 'key', 'data')
+
+    def __init__(self, source, text: str):
+        self.source = source  # what the entry was built from; compared on lookup
+        self.text = text
+        self.key = _prefilter_key(text)
+        # ASCII text encoded once for hyperscan (byte offsets equal str offsets);
+        # None when hyperscan is missing or the text is not ASCII
+        self.data = memoryview(text.encode('ascii')) if hyperscan is not None and text.isascii() else None
+
+
+def _next_line(text: str, le: int) -> Optional[str]:
+    """The line after the one ending at le, or None if that was the last line."""
+    if le >= len(text):
+        return None
+    ne = text.find('\n', le + 1)
+    return text[le + 1:ne] if ne >= 0 else text[le + 1:]
+
+
+def _matching_lines(search_regex, text: str):
+    """Yield (line_no, line, next_line) for each line of text containing a match.
+
+    Scans the whole text with search_regex instead of calling it once per line.
+    next_line is None on the last line. Matches are only counted when they lie
+    within a single line, as if each line were searched on its own.
+    """
+    pos = 0
+    line_no = 1
+    line_start = 0
+    while True:
+        m = search_regex.search(text, pos)
+        if m is None:
+            return
+        start = m.start()
+        ls = text.rfind('\n', 0, start) + 1
+        le = text.find('\n', start)
+        if le < 0:
+            le = len(text)
+        line_no += text.count('\n', line_start, ls)
+        line_start = ls
+        # The pattern may skip a newline as a separator; such a match does not
+        # count, but another one may still fit inside this line
+        if m.end() <= le or search_regex.search(text, start, le):
+            yield line_no, text[ls:le], _next_line(text, le)
+        if le >= len(text):
+            return
+        pos = le + 1
+
+
+# Match ends hyperscan reports before handing back to Python; small enough that a
+# page-limited search does not scan far past its last needed hit
+_HS_BATCH = 64
+# re's \s on ASCII text: \t-\r and \x1c-\x20 (PCRE's \s lacks \x1c-\x1f)
+_HS_SEPARATOR = r'[-\x09-\x0d\x1c-\x20]'
+
+
+@lru_cache(maxsize=256)
+def _hyperscan_db(search_pattern: str):
+    """Compile a normalize_query_for_search pattern for hyperscan, or return None.
+
+    Only ASCII patterns are compiled: hyperscan's caseless matching is ASCII-only
+    without UTF-8 mode, and its Unicode case folding differs from re.IGNORECASE.
+    Databases are shared between threads, so scans must pass their own Scratch.
+    """
+    if hyperscan is None or not search_pattern.isascii():
+        return None
+    db = hyperscan.Database()
+    try:
+        db.compile(expressions=[search_pattern.replace(r'[-\s]', _HS_SEPARATOR).encode('ascii')],
+                   flags=[hyperscan.HS_FLAG_CASELESS])
+    except hyperscan.error as e:
+        logger.debug(f"hyperscan cannot compile {search_pattern!r}, using re: {e}")
+        return None
+    return db
+
+
+def _collect_end(match_id, start, end, flags, ends):
+    ends.append(end)
+    return len(ends) >= _HS_BATCH  # True stops the scan
+
+
+def _hs_matching_lines(hs_scan, search_regex, text: str, data: memoryview):
+    """_matching_lines for ASCII text, finding candidate lines with hyperscan.
+
+    hyperscan reports match ends only, and also reports matches that skip a
+    newline, so each candidate line is confirmed with search_regex; lines
+    without a hyperscan match cannot contain a re match and are never visited.
+    data is text encoded as ASCII.
+    """
+    ends = []
+    pos = 0  # offset the next scan starts from; lines before it are handled
+    line_no = 1
+    line_start = 0
+    while pos < len(text):
+        ends.clear()
+        try:
+            hs_scan(data[pos:], match_event_handler=_collect_end, context=ends)
+            stopped = False
+        except hyperscan.ScanTerminated:
+            stopped = True
+        scan_start = pos
+        for end in ends:
+            last = scan_start + end - 1  # last character of the match
+            if last < pos:
+                continue  # on a line already handled
+            ls = text.rfind('\n', 0, last) + 1
+            le = text.find('\n', last)
+            if le < 0:
+                le = len(text)
+            line_no += text.count('\n', line_start, ls)
+            line_start = ls
+            pos = le + 1
+            if search_regex.search(text, ls, le):
+                yield line_no, text[ls:le], _next_line(text, le)
+        if not stopped:
+            return
+
+
+# Document views by file name, most recently used last
+_DOC_CACHE = OrderedDict()
+_DOC_CACHE_MAX = 4096
+_doc_cache_lock = threading.Lock()
+
+
+def _doc_source(file_name: str, text: str):
+    """What a document's view is built from: (mtime_ns, size) for PDFs on disk, else text."""
+    if file_name.lower().endswith('.pdf') and os.path.exists(file_name):
+        st = os.stat(file_name)
+        return (st.st_mtime_ns, st.st_size)
+    return text
+
+
+def _cached_view(file_name: str, source) -> Optional[_DocView]:
+    with _doc_cache_lock:
+        view = _DOC_CACHE.get(file_name)
+        if view is not None and (view.source is source or view.source == source):
+            if view.source is not source and isinstance(source, str):
+                # Same text from a reloaded index: adopt the new string, so later
+                # lookups pass the identity check and the old corpus can be freed
+                view.source = view.text = source
+            _DOC_CACHE.move_to_end(file_name)
+            return view
+    return None
+
+
+def _store_view(file_name: str, view: _DocView) -> None:
+    with _doc_cache_lock:
+        _DOC_CACHE[file_name] = view
+        _DOC_CACHE.move_to_end(file_name)
+        while len(_DOC_CACHE) > _DOC_CACHE_MAX:
+            _DOC_CACHE.popitem(last=False)
+
+
+def _prefetch_pdf_views(file_names: List[str]) -> None:
+    """Extract PDFs that are not cached or changed on disk in worker processes.
+
+    Text already in the on-disk extraction cache (e.g. from the last rebuild) is
+    read here; only PDFs that need parsing go to the pool. PDFium is not
+    thread-safe, so parallel extraction uses processes, as the indexer does; the
+    workers also fill the on-disk cache.
+    """
+    stale = {}
+    for f in file_names:
+        if f.lower().endswith('.pdf') and os.path.exists(f):
+            source = _doc_source(f, None)
+            if _cached_view(f, source) is not None:
+                continue
+            text = cached_pdf_text(f, source)
+            if text is not None:
+                _store_view(f, _DocView(source, text))
+            else:
+                stale[f] = source
+    workers = min(len(stale), os.cpu_count() or 1)
+    if workers < 2:
+        return  # the scan extracts them one by one as it reaches them
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            texts = list(executor.map(extract_pdf_text, stale))
+    except Exception as e:
+        logger.warning(f"Parallel PDF extraction unavailable, extracting during the scan: {e}")
+        return
+    # Stored under the signature taken before extraction, so a file changed
+    # meanwhile is extracted again when the scan reaches it
+    for (f, source), text in zip(stale.items(), texts):
+        _store_view(f, _DocView(source, text))
+
+
+def _doc_view(file_name: str, text: str) -> _DocView:
+    """Return the cached view of a document, rebuilding it if the document changed.
+
+    PDFs are re-extracted from disk (so results reflect the current file), which is
+    keyed on the file's mtime/size; other documents on the indexed text itself
+    (an identity check in the common case of an unchanged index).
+    """
+    source = _doc_source(file_name, text)
+    view = _cached_view(file_name, source)
+    if view is not None:
+        return view
+    if isinstance(source, tuple):
+        # Handle PDF files - extract text on-the-fly
+        text = extract_pdf_text(file_name)
+    view = _DocView(source, text)
+    _store_view(file_name, view)
+    return view
+
+
+@lru_cache(maxsize=2048)
 def normalize_query_for_search(query: str) -> str:
     """Create a regex pattern that matches query with optional hyphens/spaces between words.
     
@@ -44,7 +309,112 @@ def normalize_query_for_search(query: str) -> str:
     return re.escape(query)
 
 
-def simple_synthesizer(query: str, contexts: List[str], doc_ids: Optional[List[str]] = None, top_k: int = 10) -> str:
+@lru_cache(maxsize=2048)
+def _compiled_search_regex(query: str) -> re.Pattern:
+    """Case-insensitive search regex for query; repeated queries skip rebuilding it."""
+    return re.compile(normalize_query_for_search(query), re.IGNORECASE)
+
+
+def _highlight_and_escape(text: str, search_regex) -> str:
+    """HTML-escape text, wrapping each match of search_regex in <mark> and newlines as <br>.
+
+    Matching runs on the raw text in one pass, so matches are not split by (or
+    found inside) the entities escaping introduces.
+    """
+    out = []
+    pos = 0
+    for m in search_regex.finditer(text):
+        out.append(html.escape(text[pos:m.start()]))
+        out.append('<mark>')
+        out.append(html.escape(m.group(0)))
+        out.append('</mark>')
+        pos = m.end()
+    out.append(html.escape(text[pos:]))
+    return ''.join(out).replace('\n', '<br>')
+
+
+def _scan_document(search_regex, view: _DocView, file_name: str, quoted_query: str,
+                   max_hits: Optional[int] = None, hs_scan=None) -> List[str]:
+    """Result HTML for each matching line of one document, stopping after max_hits.
+
+    Documents are scanned one after another: ``re`` holds the GIL while matching,
+    so running this on a thread pool only adds hand-off overhead.
+    """
+    hits = []
+    # Per-document parts of each hit's HTML, computed once rather than per hit
+    # URL encode the path for the view/download endpoints
+    quoted_path = urllib.parse.quote(os.path.abspath(file_name))
+    is_pdf = file_name.lower().endswith('.pdf')
+    is_docx = file_name.lower().endswith(('.docx', '.doc'))
+    fields = {
+        'path': quoted_path,
+        'query': quoted_query,
+        'name': html.escape(os.path.basename(file_name)),
+        'doc_link': _DOCX_LINK_TMPL.format(path=quoted_path) if is_docx else '',
+    }
+    
+    # One scan over the whole document (flexible matching handles hyphens)
+    if hs_scan is not None and view.data is not None:
+        lines = _hs_matching_lines(hs_scan, search_regex, view.text, view.data)
+    else:
+        lines = _matching_lines(search_regex, view.text)
+    for line_no, line, next_line in lines:
+        # Collect ALL matches, not just top_k
+        # Show context: current line + next line (at least 2 lines per result)
+        context_lines = []
+        
+        # Current line (the match) - remove [Page X] prefix for cleaner display
+        current_line = _PAGE_MARKER_RE.sub('', line.strip())
+        context_lines.append(current_line)
+        
+        # Add next line if available - clean page marker
+        if next_line is not None:
+            next_line = _PAGE_MARKER_RE.sub('', next_line.strip())
+            if next_line:  # Only add if not empty
+                context_lines.append(next_line)
+        
+        # Combine lines with line break, truncate if too long
+        combined_text = '\n'.join(context_lines)
+        if len(combined_text) > 400:
+            combined_text = combined_text[:400] + '...'
+        
+        # Escape HTML and highlight the query match (same flexible pattern), with
+        # line breaks preserved as <br>
+        highlighted_text = _highlight_and_escape(combined_text, search_regex)
+        
+        # For PDFs, extract page number if present (from original line, not cleaned)
+        page_info = ""
+        page_num = 1
+        if '[Page ' in line:
+            page_match = _PAGE_TAG_RE.search(line)
+            if page_match:
+                page_num = int(page_match.group(1))
+                page_info = f" (Page {page_num})"
+        elif '[Para ' in line:
+            para_match = _PARA_TAG_RE.search(line)
+            if para_match:
+                page_info = f" (Para {para_match.group(1)})"
+        elif '[Table ' in line:
+            table_match = _TABLE_TAG_RE.search(line)
+            if table_match:
+                page_info = f" (Table {table_match.group(1)})"
+        
+        # For PDFs, link to the page in the actual document (Word links are per document)
+        if is_pdf:
+            fields['doc_link'] = _PDF_LINK_TMPL.format(path=quoted_path, page=page_num)
+        
+        fields['line_no'] = line_no
+        fields['page_info'] = page_info
+        fields['text'] = highlighted_text
+        hits.append(_RESULT_TMPL.format_map(fields))
+        if max_hits and len(hits) >= max_hits:
+            break
+    return hits
+
+
+
+def simple_synthesizer(query: str, contexts: List[str], doc_ids: Optional[List[str]] = None, top_k: int = 10,
+                       page: Optional[int] = None) -> str:
     """Simple text search function: finds all matching lines (case insensitive) in contexts.
     Returns HTML with file names, line numbers, and clickable links where matches are found.
     
@@ -53,131 +423,87 @@ def simple_synthesizer(query: str, contexts: List[str], doc_ids: Optional[List[s
         contexts: List of document texts to search
         doc_ids: Optional list of document IDs/file paths
         top_k: Number of findings shown on one page (results per page)
+        page: If given, stop once pages 1..page are filled (the header then reports
+            "N+" matches); None collects every match, as client-side pagination needs
     """
-    import html
-    import urllib.parse
-    
     if not query.strip():
         return "No search query provided."
     
     query_lower = query.lower()
     # Create flexible pattern to match with/without hyphens (e.g., 'bowtie' matches 'bow-tie')
-    search_pattern = normalize_query_for_search(query)
-    search_regex = re.compile(search_pattern, re.IGNORECASE)
+    search_regex = _compiled_search_regex(query)
+    hs_db = _hyperscan_db(search_regex.pattern)
+    # The cached database is shared; scratch space is per query
+    hs_scan = partial(hs_db.scan, scratch=hyperscan.Scratch(hs_db)) if hs_db else None
+    query_key = _prefilter_key(query)
+    quoted_query = urllib.parse.quote(query)
+    # One hit past the requested pages tells us whether there are more
+    limit = page * top_k + 1 if page else None
     results = []
+    if limit is None and doc_ids:
+        # A full scan visits every document, so extract the stale PDFs up front
+        _prefetch_pdf_views(doc_ids[:len(contexts)])
     
     for i, text in enumerate(contexts):
+        if limit and len(results) >= limit:
+            break
         # Get file name from doc_ids if available, otherwise use index
         file_name = doc_ids[i] if doc_ids and i < len(doc_ids) else f"Document {i+1}"
         
-        # Handle PDF files - extract text on-the-fly if needed
-        if file_name.lower().endswith('.pdf') and os.path.exists(file_name):
-            text = extract_pdf_text(file_name)
+        # The pre-check key is cached per document across queries
+        view = _doc_view(file_name, text)
         
-        lines = text.split('\n')
-        for line_no, line in enumerate(lines, start=1):
-            # Use regex pattern for flexible matching (handles hyphens)
-            if search_regex.search(line):
-                # Collect ALL matches, not just top_k
-                # Show context: current line + next line (at least 2 lines per result)
-                context_lines = []
-                
-                # Helper function to clean page markers from display
-                def clean_page_marker(text):
-                    """Remove [Page X] prefix from line for cleaner display"""
-                    return re.sub(r'^\[Page \d+\]\s*', '', text)
-                
-                # Current line (the match) - clean page marker
-                current_line = clean_page_marker(line.strip())
-                context_lines.append(current_line)
-                
-                # Add next line if available - clean page marker
-                if line_no < len(lines):
-                    next_line = clean_page_marker(lines[line_no].strip())  # line_no is already the next index (0-based vs 1-based)
-                    if next_line:  # Only add if not empty
-                        context_lines.append(next_line)
-                
-                # Combine lines with line break, truncate if too long
-                combined_text = '\n'.join(context_lines)
-                if len(combined_text) > 400:
-                    combined_text = combined_text[:400] + '...'
-                
-                # Escape HTML and highlight the query match
-                escaped_text = html.escape(combined_text)
-                # Case-insensitive highlight - use same flexible pattern
-                highlighted_text = search_regex.sub(
-                    r'<mark>\g<0></mark>',
-                    escaped_text
-                )
-                
-                # Preserve line breaks in HTML
-                highlighted_text = highlighted_text.replace('\n', '<br>')
-                
-                # Create link to view endpoint for browser viewing
-                abs_path = os.path.abspath(file_name)
-                # URL encode the path and query for the view endpoint
-                view_url = f"/view?file={urllib.parse.quote(abs_path)}&line={line_no}&query={urllib.parse.quote(query)}"
-                
-                # For PDFs, extract page number if present (from original line, not cleaned)
-                page_info = ""
-                page_num = 1
-                para_num = 1
-                is_pdf = file_name.lower().endswith('.pdf')
-                is_docx = file_name.lower().endswith(('.docx', '.doc'))
-                
-                if '[Page ' in line:
-                    import re as re2
-                    page_match = re2.search(r'\[Page (\d+)\]', line)
-                    if page_match:
-                        page_num = int(page_match.group(1))
-                        page_info = f" (Page {page_num})"
-                elif '[Para ' in line:
-                    import re as re2
-                    para_match = re2.search(r'\[Para (\d+)\]', line)
-                    if para_match:
-                        para_num = int(para_match.group(1))
-                        page_info = f" (Para {para_num})"
-                elif '[Table ' in line:
-                    import re as re2
-                    table_match = re2.search(r'\[Table (\d+)\]', line)
-                    if table_match:
-                        page_info = f" (Table {table_match.group(1)})"
-                
-                # For PDFs/Word docs, add a link to open the actual document
-                doc_link = ""
-                if is_pdf:
-                    pdf_url = f"/download?file={urllib.parse.quote(abs_path)}&page={page_num}"
-                    doc_link = f' <a href="{pdf_url}#page={page_num}" target="_blank" class="pdf-link" title="Open PDF in browser">📖 Open PDF</a>'
-                elif is_docx:
-                    docx_url = f"/download?file={urllib.parse.quote(abs_path)}"
-                    doc_link = f' <a href="{docx_url}" target="_blank" class="pdf-link" title="Download Word document">📝 Open Doc</a>'
-                
-                results.append(
-                    f'<div class="result-item">'
-                    f'<div class="result-file">'
-                    f'<a href="{view_url}" target="_blank" title="View extracted text at line {line_no}">'
-                    f'📄 {html.escape(os.path.basename(file_name))}</a>'
-                    f'<span class="result-location"> : Line {line_no}{page_info}</span>'
-                    f'{doc_link}'
-                    f'</div>'
-                    f'<div class="result-text">{highlighted_text}</div>'
-                    f'</div>'
-                )
-    
+        # Skip documents that cannot contain a match with one C-level substring scan
+        # instead of running the regex on each of their lines
+        if query_key not in view.key:
+            continue
+        
+        remaining = limit - len(results) if limit else None
+        results.extend(_scan_document(search_regex, view, file_name, quoted_query, remaining, hs_scan))
+
     if not results:
         return f"No matches found for '{html.escape(query)}'."
     
+    more = ""
+    if limit and len(results) >= limit:
+        results.pop()
+        more = "+"
     total_matches = len(results)
-    truncated_msg = f" (showing {min(top_k, total_matches)} per page)" if total_matches > top_k else ""
-    header = f'<div class="search-header">Search results for "<strong>{html.escape(query)}</strong>" ({total_matches} total matches{truncated_msg})</div>'
+    truncated_msg = f" (showing {min(top_k, total_matches)} per page)" if total_matches > top_k or more else ""
+    header = f'<div class="search-header">Search results for "<strong>{html.escape(query)}</strong>" ({total_matches}{more} total matches{truncated_msg})</div>'
     return header + '\n'.join(results) 
 
+# Shared OpenAI clients, so calls reuse the client's HTTP connection pool instead
+# of opening a new TLS session each time. The async client is kept per event loop,
+# since its connection pool belongs to the loop it was first used on.
+_openai_client = None
+_async_openai_client = None  # (event loop, client)
+_openai_client_lock = threading.Lock()
+
+
+def _get_openai_client():
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        return _openai_client
+
+
+def _get_async_openai_client():
+    global _async_openai_client
+    loop = asyncio.get_running_loop()
+    if _async_openai_client is None or _async_openai_client[0] is not loop:
+        from openai import AsyncOpenAI
+        _async_openai_client = (loop, AsyncOpenAI(api_key=OPENAI_API_KEY))
+    return _async_openai_client[1]
+
+
 def openai_completion(prompt: str) -> str:
     try:
-        from openai import OpenAI
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY not set")
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        client = _get_openai_client()
         resp = client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
@@ -185,67 +511,158 @@ def openai_completion(prompt: str) -> str:
         )
         return resp.choices[0].message.content.strip()
     except Exception as e:
-        return f"OpenAI call failed: {e}"
+        raise ProviderError(f"OpenAI call failed: {e}") from e
+
+
+async def openai_completion_async(prompt: str):
+    """Stream the OpenAI answer to prompt, yielding text deltas as they arrive.
+
+    On failure raises ProviderError, as openai_completion does.
+    """
+    try:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not set")
+        client = _get_async_openai_client()
+        stream = await client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=256,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise ProviderError(f"OpenAI call failed: {e}") from e
+
+
+# Loaded local models, most recently used last. Loading maps and parses a model
+# file of several GB, so instances are kept across calls; each entry has its own
+# lock because a llama.cpp/GPT4All instance cannot generate for two threads at once
+_MODEL_CACHE = OrderedDict()
+_MODEL_CACHE_MAX = 2
+_model_cache_lock = threading.Lock()
+
+
+def _cached_model(key, load):
+    """Return (model, lock) for key, calling load() only if it is not cached yet."""
+    with _model_cache_lock:
+        entry = _MODEL_CACHE.get(key)
+        if entry is None:
+            entry = (load(), threading.Lock())
+            _MODEL_CACHE[key] = entry
+            while len(_MODEL_CACHE) > _MODEL_CACHE_MAX:
+                _MODEL_CACHE.popitem(last=False)
+        else:
+            _MODEL_CACHE.move_to_end(key)
+    return entry
 
 
 def local_llm_completion(prompt: str, model_path: Optional[str] = None) -> str:
     """Attempt to run a local LLM via llama-cpp-python using a GGML model file.
-    Falls back to an explanatory error message if the runtime or model is unavailable.
+    Raises ProviderError with an explanatory message if the runtime or model is unavailable.
     """
     mp = model_path or LOCAL_LLM_MODEL_PATH
     try:
         from llama_cpp import Llama
     except Exception as e:
-        return f"Local LLM unavailable (llama-cpp-python not installed): {e}"
+        raise ProviderError(f"Local LLM unavailable (llama-cpp-python not installed): {e}") from e
 
     if not os.path.exists(mp):
-        return f"Local model not found at {mp}. Download a GGML model and set LOCAL_LLM_MODEL_PATH."
+        raise ProviderError(f"Local model not found at {mp}. Download a GGML model and set LOCAL_LLM_MODEL_PATH.")
 
     try:
-        llm = Llama(model_path=mp)
-        resp = llm.create_completion(prompt=prompt, max_tokens=256)
+        # Keyed on mtime as well, so a replaced model file is loaded again
+        llm, lock = _cached_model(('local', mp, os.path.getmtime(mp)), lambda: Llama(model_path=mp))
+        with lock:
+            resp = llm.create_completion(prompt=prompt, max_tokens=256)
         # response shape: {'choices': [{'text': '...'}], ...}
         return resp.get("choices", [{}])[0].get("text", "").strip()
     except Exception as e:
-        return f"Local LLM call failed: {e}"
+        raise ProviderError(f"Local LLM call failed: {e}") from e
 
 
 def local_gpt4all_completion(prompt: str, model_name: Optional[str] = None, model_path: Optional[str] = None) -> str:
     """Attempt to run a local LLM via the GPT4All Python package.
-    Falls back to an explanatory error message if the runtime or model is unavailable.
+    Raises ProviderError with an explanatory message if the runtime or model is unavailable.
     """
     try:
         from gpt4all import GPT4All
     except Exception as e:
-        return f"GPT4All unavailable (gpt4all package not installed): {e}"
+        raise ProviderError(f"GPT4All unavailable (gpt4all package not installed): {e}") from e
 
     try:
         if model_path and os.path.exists(model_path):
-            model = GPT4All(model_path=model_path)
+            model, lock = _cached_model(('gpt4all', model_path, os.path.getmtime(model_path)),
+                                        lambda: GPT4All(model_path=model_path))
         elif model_name:
-            model = GPT4All(model_name=model_name)
+            model, lock = _cached_model(('gpt4all', model_name), lambda: GPT4All(model_name=model_name))
         else:
             # let GPT4All pick a default model if available
-            model = GPT4All()
+            model, lock = _cached_model(('gpt4all', None), GPT4All)
 
         # `generate` returns the generated text for common GPT4All builds
-        out = model.generate(prompt, max_length=256)
+        with lock:
+            out = model.generate(prompt, max_length=256)
         if isinstance(out, dict):
             # some builds return dicts with a 'text' key
             return out.get("text", "").strip()
         return str(out).strip()
     except Exception as e:
-        return f"GPT4All call failed: {e}"
+        raise ProviderError(f"GPT4All call failed: {e}") from e
+
+_CONTEXT_SEP = "\n\n---\n\n"
+
+
+def _llm_prompt(query: str, retrieved_texts: List[str]) -> str:
+    """Prompt for the LLM providers, with at most LLM_MAX_CONTEXT_CHARS of context.
+
+    retrieved_texts are in ranking order, so truncation drops the least relevant
+    text; it is written piece by piece rather than joined and then copied again.
+    """
+    limit = LLM_MAX_CONTEXT_CHARS
+    buf = StringIO()
+    buf.write("Use the following contexts to answer the query:\n\n")
+    size = 0
+    for i, text in enumerate(retrieved_texts):
+        if i:
+            if limit and size + len(_CONTEXT_SEP) >= limit:
+                break
+            buf.write(_CONTEXT_SEP)
+            size += len(_CONTEXT_SEP)
+        if limit and size + len(text) > limit:
+            buf.write(text[:limit - size])
+            break
+        buf.write(text)
+        size += len(text)
+    buf.write(f"\n\nQuery: {query}\nAnswer:")
+    return buf.getvalue()
 
-def answer_query(query: str, retrieved_texts: List[str], provider: str = 'openai', doc_ids: Optional[List[str]] = None, top_k: int = 10) -> str:
-    contexts_formatted = "\n\n---\n\n".join(retrieved_texts)
-    prompt = f"Use the following contexts to answer the query:\n\n{contexts_formatted}\n\nQuery: {query}\nAnswer:"
+
+def answer_query(query: str, retrieved_texts: List[str], provider: str = 'openai', doc_ids: Optional[List[str]] = None, top_k: int = 10,
+                 page: Optional[int] = None) -> str:
+    """Answer query from retrieved_texts with provider; raises ProviderError if an LLM provider fails."""
+    prompt = _llm_prompt(query, retrieved_texts)
     if provider == 'gpt4all':
         return local_gpt4all_completion(prompt)
     if provider == 'local':
         return local_llm_completion(prompt)
     if provider == 'simple':
-        return simple_synthesizer(query, retrieved_texts, doc_ids, top_k)
+        return simple_synthesizer(query, retrieved_texts, doc_ids, top_k, page)
     if provider == 'openai' and OPENAI_API_KEY:
         return openai_completion(prompt)
-    return simple_synthesizer(query, retrieved_texts, doc_ids, top_k)
+    return simple_synthesizer(query, retrieved_texts, doc_ids, top_k, page)
+
+
+async def answer_query_async(query: str, retrieved_texts: List[str], provider: str = 'openai', doc_ids: Optional[List[str]] = None, top_k: int = 10,
+                             page: Optional[int] = None) -> str:
+    """Async counterpart of answer_query for async request handlers.
+
+    OpenAI is called through the async client on the event loop itself. The other
+    providers are blocking (regex scan, llama.cpp/GPT4All), so they run in a worker
+    thread and the event loop stays free.
+    """
+    if provider == 'openai' and OPENAI_API_KEY:
+        parts = [delta async for delta in openai_completion_async(_llm_prompt(query, retrieved_texts))]
+        return ''.join(parts).strip()
+    return await asyncio.to_thread(answer_query, query, retrieved_texts, provider, doc_ids, top_k, page)
@@ -1,25 +1,56 @@
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from typing import List
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import List, Optional
 
 class Retriever:
-    def __init__(self, vectors: np.ndarray, max_neighbors: int = 100):
-        # Use cosine metric via metric='cosine'
-        self.vectors = vectors
-        # Set n_neighbors to min of max_neighbors and actual vector count
-        n = min(max_neighbors, len(vectors))
-        self.nn = NearestNeighbors(n_neighbors=n, metric='cosine')
-        self.nn.fit(vectors)
+    """Cosine-similarity search over the index's TF-IDF matrix.
 
-    def query(self, q_vector: np.ndarray, top_k: int = 5):
-        qv = q_vector.reshape(1, -1)
+    Vectors are L2-normalized per document and stored term-major (the transpose,
+    as CSR), so row t lists the documents containing term t: a query is a single
+    sparse product that reads only the rows of the terms it contains, rather than
+    every document's row.
+    """
+    def __init__(self, vectors, docs: Optional[List[dict]] = None):
+        # Older indexes stored dense float64 arrays; convert so there is a single
+        # code path, in float32 (half the bytes streamed per query, same ranking)
+        vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32), norm='l2')
+        self.postings = vectors.T.tocsr()
+        # Parallel per-row lists (and id -> row) so callers map ranked rows to
+        # documents without going through the list of doc dicts
+        docs = docs or []
+        self.ids = [d['id'] for d in docs]
+        self.texts = [d['text'] for d in docs]
+        self.rows = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+    def query(self, q_vector, top_k: int = 5):
+        idxs, sims = self.query_batch(q_vector, top_k)
+        return idxs[0], sims[0]
+
+    def query_batch(self, q_matrix, top_k: int = 5):
+        """Rank the documents for every row of q_matrix with one matrix product.
+
+        Returns per-query lists: ``(idxs, sims)`` where ``idxs[i]`` and ``sims[i]``
+        are the top_k rows and scores for query i, as ``query`` returns them.
+        """
+        if not sparse.issparse(q_matrix):
+            q_matrix = np.atleast_2d(np.asarray(q_matrix))
+        qm = normalize(q_matrix.astype(np.float32, copy=False), norm='l2')
+        # Unit rows on both sides: dot product == cosine similarity
+        sims = qm @ self.postings
+        sims = sims.toarray() if sparse.issparse(sims) else np.asarray(sims)
+        n = sims.shape[1]
         # Clamp top_k to actual number of samples and ensure at least 1
-        k = max(1, min(top_k, len(self.vectors)))
-        dists, idxs = self.nn.kneighbors(qv, n_neighbors=k)
-        # cosine distance -> similarity
-        sims = 1.0 - dists[0]
-        return idxs[0].tolist(), sims.tolist()
+        k = max(1, min(top_k, n))
+        if k < n:
+            # O(N) partial selection of the k best per query, then sort just those k
+            idxs = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(sims, idxs, axis=1), axis=1, kind='stable')
+            idxs = np.take_along_axis(idxs, order, axis=1)
+        else:
+            idxs = np.argsort(-sims, axis=1, kind='stable')
+        return idxs.tolist(), np.take_along_axis(sims, idxs, axis=1).tolist()
 
     @classmethod
     def from_index(cls, index: dict):
-        return cls(index['vectors'])
+        return cls(index['vectors'], index.get('docs'))
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from rag_app.indexer import build_index, load_index
+
+
+def write(path, text, mtime):
+	path.write_text(text, encoding="utf-8")
+	os.utime(path, ns=(mtime, mtime))  # mtime/size is what marks a file as changed
+
+
+def texts_by_id(index):
+	return {d["id"]: d["text"] for d in index["docs"]}
+
+
+def assert_rows_match_docs(index):
+	# Every row must be the vector of the doc at the same position
+	expected = index["vectorizer"].transform([d["text"] for d in index["docs"]])
+	assert np.allclose(index["vectors"].toarray(), expected.toarray())
+
+
+def test_incremental_build_modify_delete_add(tmp_path):
+	data = tmp_path / "data"
+	data.mkdir()
+	index_path = str(tmp_path / "index" / "index.joblib")
+	write(data / "a.txt", "apple banana cherry", 1_000_000_000)
+	write(data / "b.txt", "banana grape melon", 1_000_000_000)
+	write(data / "c.txt", "cherry grape apple", 1_000_000_000)
+	full = build_index(str(data), index_path, jobs=1)
+	vocabulary = dict(full["vectorizer"].vocabulary_)
+
+	write(data / "b.txt", "banana grape melon apple", 2_000_000_000)
+	os.remove(data / "c.txt")
+	write(data / "d.txt", "melon cherry elderberry", 2_000_000_000)
+	index = build_index(str(data), index_path, jobs=1, incremental=True)
+
+	assert index["incremental_updates"] == 1
+	assert texts_by_id(index) == {
+		str(data / "a.txt"): "apple banana cherry",
+		str(data / "b.txt"): "banana grape melon apple",
+		str(data / "d.txt"): "melon cherry elderberry",
+	}
+	# The fitted vocabulary is kept, so a term only in a new file is not in it
+	assert index["vectorizer"].vocabulary_ == vocabulary
+	assert "elderberry" not in vocabulary
+	assert_rows_match_docs(index)
+
+	loaded = load_index(index_path)
+	assert loaded["docs"] == index["docs"]
+	assert np.allclose(loaded["vectors"].toarray(), index["vectors"].toarray())
+	assert loaded["manifest"] == index["manifest"]
+
+
+def test_incremental_build_unchanged_returns_saved_index(tmp_path):
+	data = tmp_path / "data"
+	data.mkdir()
+	index_path = str(tmp_path / "index" / "index.joblib")
+	write(data / "a.txt", "apple banana cherry", 1_000_000_000)
+	write(data / "b.txt", "banana grape melon", 1_000_000_000)
+	full = build_index(str(data), index_path, jobs=1)
+
+	index = build_index(str(data), index_path, jobs=1, incremental=True)
+	assert index["docs"] == full["docs"]
+	assert index["incremental_updates"] == 0
+
+
+def test_incremental_build_without_kept_rows_does_full_rebuild(tmp_path):
+	data = tmp_path / "data"
+	data.mkdir()
+	index_path = str(tmp_path / "index" / "index.joblib")
+	write(data / "a.txt", "apple banana cherry", 1_000_000_000)
+	write(data / "b.txt", "banana grape melon", 1_000_000_000)
+	build_index(str(data), index_path, jobs=1)
+
+	# Every file changed: nothing is left to keep, so the vocabulary is refitted
+	write(data / "a.txt", "kiwi lemon elderberry", 2_000_000_000)
+	write(data / "b.txt", "lemon mango papaya", 2_000_000_000)
+	index = build_index(str(data), index_path, jobs=1, incremental=True)
+
+	assert index["incremental_updates"] == 0
+	assert "elderberry" in index["vectorizer"].vocabulary_
+	assert "apple" not in index["vectorizer"].vocabulary_
+	assert_rows_match_docs(index)
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from rag_app import llm
+
+# Separators the search pattern may skip, newlines and characters re treats specially
+ALPHABET = "abAB-\n \t\x0b\x1c\x1f\r#[.x"
+QUERY_ALPHABET = "abAB- #[.\t"
+
+
+def per_line_matches(search_regex, text):
+	"""What _matching_lines must return: search_regex run on each line by itself."""
+	lines = text.split('\n')
+	return [
+		(i, line, lines[i] if i < len(lines) else None)
+		for i, line in enumerate(lines, start=1)
+		if search_regex.search(line)
+	]
+
+
+def random_cases(seed, count, alphabet=ALPHABET):
+	rng = random.Random(seed)
+	while count:
+		text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+		query = "".join(rng.choice(QUERY_ALPHABET) for _ in range(rng.randint(1, 4)))
+		if query.strip():
+			count -= 1
+			yield rng, text, llm._compiled_search_regex(query)
+
+
+def test_matching_lines_agrees_with_per_line_search():
+	for _, text, search_regex in random_cases(seed=4, count=20000):
+		assert list(llm._matching_lines(search_regex, text)) == per_line_matches(search_regex, text), (search_regex.pattern, text)
+
+
+def test_matching_lines_non_ascii():
+	for _, text, search_regex in random_cases(seed=5, count=5000, alphabet=ALPHABET + "éİKß"):
+		assert list(llm._matching_lines(search_regex, text)) == per_line_matches(search_regex, text), (search_regex.pattern, text)
+
+
+def test_matching_lines_separator_across_newline():
+	# "bow-tie" allows one separator between letters; a newline must not count as one
+	search_regex = llm._compiled_search_regex("bowtie")
+	text = "bow\ntie\nbow tie\nBOW-TIE and bowtie"
+	assert list(llm._matching_lines(search_regex, text)) == [
+		(3, "bow tie", "BOW-TIE and bowtie"),
+		(4, "BOW-TIE and bowtie", None),
+	]
+
+
+@pytest.mark.skipif(llm.hyperscan is None, reason="hyperscan not installed")
+def test_hs_matching_lines_agrees_with_per_line_search(monkeypatch):
+	for rng, text, search_regex in random_cases(seed=8, count=20000):
+		hs_db = llm._hyperscan_db(search_regex.pattern)
+		assert hs_db is not None, search_regex.pattern
+		# Small batches make the scan resume mid-text, after lines already handled
+		monkeypatch.setattr(llm, "_HS_BATCH", rng.choice([1, 2, 64]))
+		lines = llm._hs_matching_lines(hs_db.scan, search_regex, text, memoryview(text.encode('ascii')))
+		assert list(lines) == per_line_matches(search_regex, text), (search_regex.pattern, text)
+
+
+@pytest.mark.skipif(llm.hyperscan is None, reason="hyperscan not installed")
+def test_doc_view_keeps_hyperscan_bytes_for_ascii_only():
+	assert llm._DocView("text", "plain ascii").data.tobytes() == b"plain ascii"
+	assert llm._DocView("text", "caf\u00e9").data is None
@@ -0,0 +1,42 @@
+import mmap
+import random
+
+import pytest
+
+from rag_app import api
+from rag_app.indexer import read_text_file
+
+
+def span_lines(path):
+	"""Lines of path as /view decodes them from the spans _line_spans returns."""
+	with open(path, 'rb') as f:
+		mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	with mm:
+		starts, ends = api._line_spans(mm)
+		return [str(mm[s:e], 'utf-8', 'ignore') for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+@pytest.mark.parametrize("content", [
+	b"one",
+	b"one\n",
+	b"one\ntwo\r\nthree\rfour",
+	b"\r\n\r\n",
+	b"\r\r\n\n\r",
+	b"trailing cr\r",
+	"café\r\nnaïve\n".encode('utf-8'),
+])
+def test_line_spans_match_read_text_file(tmp_path, content):
+	path = tmp_path / "doc.txt"
+	path.write_bytes(content)
+	assert span_lines(path) == read_text_file(str(path)).split('\n')
+
+
+@pytest.mark.parametrize("block", [1, 2, 3, 7])
+def test_line_spans_across_block_boundaries(tmp_path, monkeypatch, block):
+	# Tiny blocks put \r and its \n in different blocks in most of these files
+	monkeypatch.setattr(api, "_SCAN_BLOCK", block)
+	rng = random.Random(block)
+	path = tmp_path / "doc.txt"
+	for _ in range(500):
+		path.write_bytes(bytes(rng.choice(b"ab\r\n") for _ in range(rng.randint(1, 40))))
+		assert span_lines(path) == read_text_file(str(path)).split('\n'), path.read_bytes()